@@ -0,0 +1,167 @@
+import math
+import re
+
+import numpy as np
+
+""" Модуль статистики цен опубликованных карточек: колонки цены, площади,
+комнат, района и типа жилья хранятся в массивах NumPy и дополняются по одной
+записи, а медианы и квантили считаются векторно по району и типу.
+"""
+
+_NUMBER_RE = re.compile(r'\d+(?:[.,]\d+)?')
+
+# Столбцы хранилища и их типы; район и тип — индексы в справочниках, -1 — неизвестно
+_COLUMNS = {
+    "price": np.float64,
+    "area": np.float64,
+    "rooms": np.float64,
+    "district": np.int16,
+    "property_type": np.int16,
+}
+
+
+def parse_number(text):
+    """Достаёт число из ввода агента: «5 500 000», «5,5 млн», «45,6 м²»; иначе nan."""
+    if text is None:
+        return math.nan
+    if isinstance(text, (int, float)):
+        return float(text)
+    compact = str(text).replace('\xa0', '').replace(' ', '').lower()
+    match = _NUMBER_RE.search(compact)
+    if not match:
+        return math.nan
+    value = float(match.group().replace(',', '.'))
+    if 'млн' in compact:
+        value *= 1_000_000
+    elif 'тыс' in compact:
+        value *= 1_000
+    return value
+
+
+class PriceStats:
+    def __init__(self, districts, property_types, capacity=1024):
+        self.districts = list(districts)
+        self.property_types = list(property_types)
+        self._district_codes = {name: code for code, name in enumerate(self.districts)}
+        self._type_codes = {name: code for code, name in enumerate(self.property_types)}
+        self._columns = {name: np.empty(capacity, dtype) for name, dtype in _COLUMNS.items()}
+        self._size = 0
+        # Медианы цены за м² по (район, тип) — сбрасываются при каждом добавлении
+        self._medians = {}
+
+    def __len__(self):
+        return self._size
+
+    def column(self, name):
+        return self._columns[name][:self._size]
+
+    def _grow(self):
+        # Удвоение ёмкости — амортизированно O(1) на запись
+        capacity = len(self._columns["price"]) * 2
+        for name, old in self._columns.items():
+            new = np.empty(capacity, old.dtype)
+            new[:self._size] = old[:self._size]
+            self._columns[name] = new
+
+    def add(self, price, area, rooms, district, property_type):
+        price = parse_number(price)
+        if not price > 0:
+            return False
+        if self._size == len(self._columns["price"]):
+            self._grow()
+        row = self._size
+        self._columns["price"][row] = price
+        self._columns["area"][row] = parse_number(area)
+        self._columns["rooms"][row] = parse_number(rooms)
+        self._columns["district"][row] = self._district_codes.get(district, -1)
+        self._columns["property_type"][row] = self._type_codes.get(property_type, -1)
+        self._size += 1
+        self._medians.clear()
+        return True
+
+    def load(self, cards):
+        for card in cards:
+            self.add(card.get("price"), card.get("area"), card.get("rooms"),
+                     card.get("district"), card.get("property_type"))
+        return self
+
+    def price_per_m2(self):
+        area = self.column("area")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(area > 0, self.column("price") / area, np.nan)
+
+    def _mask(self, district=None, property_type=None):
+        mask = np.ones(self._size, dtype=bool)
+        if district is not None:
+            mask &= self.column("district") == self._district_codes.get(district, -2)
+        if property_type is not None:
+            mask &= self.column("property_type") == self._type_codes.get(property_type, -2)
+        return mask
+
+    def median_price_per_m2(self, district, property_type=None):
+        """Медиана цены за м² и число записей в группе."""
+        key = (district, property_type)
+        if key not in self._medians:
+            values = self.price_per_m2()[self._mask(district, property_type)]
+            values = values[~np.isnan(values)]
+            self._medians[key] = (float(np.median(values)) if len(values) else math.nan, len(values))
+        return self._medians[key]
+
+    def price_hint(self, price, area, district, property_type=None, threshold=0.25, min_samples=5):
+        """Подсказка, если цена за м² отличается от медианы района больше чем на threshold."""
+        area = parse_number(area)
+        price_per_m2 = parse_number(price) / area if area > 0 else math.nan
+        if not price_per_m2 > 0:
+            return None
+        # Сначала сравниваем с тем же типом жилья в районе, при нехватке данных — со всем районом
+        for group_type in (property_type, None):
+            median, count = self.median_price_per_m2(district, group_type)
+            if count >= min_samples:
+                break
+        else:
+            return None
+        deviation = price_per_m2 / median - 1
+        if abs(deviation) < threshold:
+            return None
+        direction = "ниже" if deviation < 0 else "выше"
+        return f"цена на {abs(deviation):.0%} {direction} медианы по {district}"
+
+    def summary(self, property_type=None):
+        """Строки (район, число карточек, медиана цены, квантили 25/50/75 цены за м²) по районам."""
+        mask = self._mask(property_type=property_type) & (self.column("district") >= 0)
+        codes = self.column("district")[mask]
+        prices = self.column("price")[mask]
+        per_m2 = self.price_per_m2()[mask]
+
+        # Группируем сортировкой по коду района: одна сортировка на все районы
+        order = np.argsort(codes, kind="stable")
+        bounds = np.flatnonzero(np.diff(codes[order])) + 1
+        rows = []
+        for group in np.split(order, bounds) if len(order) else []:
+            group_per_m2 = per_m2[group]
+            group_per_m2 = group_per_m2[~np.isnan(group_per_m2)]
+            quantiles = np.quantile(group_per_m2, [0.25, 0.5, 0.75]) if len(group_per_m2) else [math.nan] * 3
+            rows.append((
+                self.districts[codes[group[0]]],
+                len(group),
+                float(np.median(prices[group])),
+                *(float(q) for q in quantiles),
+            ))
+        return rows
+
+    def render_summary(self, property_type=None):
+        rows = self.summary(property_type)
+        if not rows:
+            return "📊 Пока нет опубликованных карточек для статистики."
+        title = f"📊 Цены по районам{f' — {property_type}' if property_type else ''}:\n"
+        lines = [title]
+        for district, count, median_price, q25, median_per_m2, q75 in rows:
+            lines.append(f"🏙 {district}: {count} шт., медиана {format_amount(median_price)}₽, "
+                         f"{format_amount(median_per_m2)}₽/м² ({format_amount(q25)}–{format_amount(q75)})")
+        return "\n".join(lines)
+
+
+def format_amount(value):
+    if math.isnan(value):
+        return "—"
+    return f"{value:,.0f}".replace(",", " ")
@@ -1,9 +1,15 @@
 import os
-import requests
+import re
 from bs4 import BeautifulSoup
 import hashlib
 import json
+import threading
+from collections import OrderedDict
 from enum import Enum
+from typing import NamedTuple
+
+from app.fetcher import fetcher as default_fetcher
+
 
 class EstateParam(Enum):
     ROOMS = ("Количество комнат", "🚪 Комнат: {}")
@@ -27,18 +33,158 @@ class EstateParam(Enum):
         self.param_name = param_name
         self.display_format = display_format
 
+    @property
+    def ordinal(self):
+        # Порядковый номер параметра — индекс его значения в Listing.params
+        return _PARAM_ORDINALS[self]
+
+
+# Ключевые слова заголовка в порядке приоритета: если в заголовке
+# несколько совпадений, побеждает стоящее выше в списке
+ESTATE_TYPES = (
+    ('квартира', 'Квартира'),
+    ('Квартира-студия', 'Студия'),
+    ('Своб. планировка', 'Свободная планировка'),
+    ('Комната', 'Комната'),
+    ('Дом', 'Дом'),
+    ('Дача', 'Дача'),
+    ('Коттедж', 'Коттедж'),
+    ('Таунхаус', 'Таунхаус'),
+    ('ИЖС', 'ИЖС'),
+    ('СНТ, ДНП', 'СНТ'),
+    ('Гараж,', 'Гараж'),
+    ('Машиноместо', 'Машиноместо'),
+)
+
+# Признаки улицы в предпоследней части адреса и номера дома в последней
+_STREET_RE = re.compile(
+    r'\b(?:ул\.|улица|пр-т|проспект|пер\.|переулок|б-р|бульвар|ш\.|шоссе|наб\.|набережная|пл\.|проезд|тракт|мкр)',
+    re.IGNORECASE,
+)
+_HOUSE_NUMBER_RE = re.compile(r'\s*\d')
+
+
+def classify_estate_type(title):
+    # Таблица собрана один раз при импорте; проверка подстроки через in выполняется в C
+    # и на дюжине ключевых слов быстрее альтернации регулярного выражения
+    for keyword, estate_type in ESTATE_TYPES:
+        if keyword in title:
+            return estate_type
+    return "Не указано"
+
+
+def normalize_address(address):
+    parts = address.split(',')
+    # Улицу и номер дома оставляем на одной строке, остальные части переносим
+    if len(parts) > 1 and (_STREET_RE.search(parts[-2]) or _HOUSE_NUMBER_RE.match(parts[-1])):
+        head, tail = parts[:-2], f"{parts[-2]},{parts[-1]}"
+    else:
+        head, tail = parts[:-1], parts[-1]
+    return ''.join(part + '\n 📍' for part in head) + tail
+
+
+MAX_PHOTOS = 10
+
+ESTATE_PARAMS = tuple(EstateParam)
+_PARAM_ORDINALS = {param: ordinal for ordinal, param in enumerate(ESTATE_PARAMS)}
+NO_PARAMS = (None,) * len(ESTATE_PARAMS)
+
+
+class Listing(NamedTuple):
+    """Неизменяемая запись разобранного объявления.
+
+    Значения параметров хранятся в кортеже params, индексированном
+    порядковым номером EstateParam; отсутствующие параметры — None.
+    photos — URL изображений галереи объявления.
+    """
+
+    type_estate: str
+    price_value: str
+    full_address: str
+    params: tuple = NO_PARAMS
+    photos: tuple = ()
+
+    def value(self, param):
+        return self.params[param.ordinal]
+
+    def to_dict(self):
+        return {
+            "type_estate": self.type_estate,
+            "price_value": self.price_value,
+            "full_address": self.full_address,
+            "params": list(self.params),
+            "photos": list(self.photos),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        params = tuple(data["params"])
+        # Кэш, записанный при другом наборе EstateParam, не подходит
+        if len(params) != len(ESTATE_PARAMS):
+            raise ValueError(f"Ожидается {len(ESTATE_PARAMS)} параметров, получено {len(params)}")
+        return cls(data["type_estate"], data["price_value"], data["full_address"], params,
+                   tuple(data.get("photos", ())))
+
+    def card_fields(self):
+        """Поля карточки для хранилища и статистики цен."""
+        return {
+            "address": self.full_address.replace('\n 📍', ','),
+            "property_type": self.type_estate,
+            "price": self.price_value,
+            "floor": self.value(EstateParam.FLOOR),
+            "area": (self.value(EstateParam.TOTAL_AREA) or self.value(EstateParam.AREA)
+                     or self.value(EstateParam.HOUSE_AREA)),
+            "rooms": self.value(EstateParam.ROOMS),
+        }
+
+    def render(self):
+        # Формируем итоговую строку
+        result = []
+        result.append(f"🌟 <b>{self.type_estate}</b>")
+        result.append(f"💵 {self.price_value}₽\n")
+        result.append(f"⛳️ {self.full_address}\n")
+
+        # Динамически добавляем параметры, если они не None
+        for param, value in zip(ESTATE_PARAMS, self.params):
+            if value is not None:
+                result.append(param.display_format.format(value))
+
+        # Объединяем строки с переносами
+        result.append('\n\n')
+        return "\n".join(result)
+
+
+class ListingCache:
+    """Потокобезопасный LRU-кэш разобранных объявлений в памяти."""
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self._listings = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        with self._lock:
+            listing = self._listings.get(url)
+            if listing is not None:
+                self._listings.move_to_end(url)
+            return listing
+
+    def put(self, url, listing):
+        with self._lock:
+            self._listings[url] = listing
+            self._listings.move_to_end(url)
+            while len(self._listings) > self.maxsize:
+                self._listings.popitem(last=False)
+
+
 class AvitoParser:
-    def __init__(self, cache_dir="cache"):
-        self.price_value = None
-        self.full_address = None
-        self.type_estate = None
-        self.cache_dir = cache_dir
-        # Создаем директорию для кэша, если её нет
-        os.makedirs(self.cache_dir, exist_ok=True)
+    """Парсер без состояния разбора: один экземпляр можно разделять между обработчиками.
+    Общий у них только кэш неизменяемых записей Listing."""
 
-        # Инициализируем все параметры как None
-        for param in EstateParam:
-            setattr(self, param.name.lower(), None)
+    def __init__(self, cache_dir="cache", fetcher=None, listing_cache=None):
+        self.cache_dir = cache_dir
+        self.fetcher = fetcher or default_fetcher
+        self.listings = listing_cache or ListingCache()
 
     def _get_cache_filename(self, url):
         # Хэшируем URL для создания уникального имени файла
@@ -46,46 +192,7 @@ class AvitoParser:
         return os.path.join(self.cache_dir, f"{url_hash}.json")
 
     def _download_html(self, url):
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        response = requests.get(url, headers=headers)
-        if response.status_code != 200:
-            raise Exception(f"Ошибка при загрузке страницы: {response.status_code}")
-        return response.text
-
-    def _process_address(self, address):
-        parts = address.split(',')
-        if 'ул.' or 'пр-т' in parts[-2]:
-            processed_parts = [part + '\n 📍' for part in parts[:-2]]
-            processed_parts.append(f"{parts[-2]},{parts[-1]}")
-        else:
-            processed_parts = [part + '\n 📍' for part in parts[:-1]]
-            processed_parts.append(parts[-1])
-        address = ''.join(processed_parts)
-        return address
-
-    def _extract_type_estate(self, title):
-        estate_types_mapping = {
-            'квартира': 'Квартира',
-            'Квартира-студия': 'Студия',
-            'Своб. планировка': 'Свободная планировка',
-            'Комната': 'Комната',
-            'Дом': 'Дом',
-            'Дача': 'Дача',
-            'Коттедж': 'Коттедж',
-            'Таунхаус': 'Таунхаус',
-            'ИЖС': 'ИЖС',
-            'СНТ, ДНП': 'СНТ',
-            'Гараж,': 'Гараж',
-            'Машиноместо': 'Машиноместо'
-        }
-        
-        for search_string, estate_type in estate_types_mapping.items():
-            if search_string in title:
-                return estate_type
-        
-        return "Не указано"
+        return self.fetcher.get(url)
 
     def _extract_param(self, params_soup, param_name):
         for li in params_soup.find_all('li', class_='params-paramsList__item-_2Y2O'):
@@ -94,6 +201,14 @@ class AvitoParser:
                 return span.next_sibling.strip()
         return None
 
+    def _extract_photos(self, soup):
+        # Кадры галереи хранят полноразмерное изображение в data-url
+        photos = [frame['data-url'] for frame in soup.select('[data-marker^="image-frame"][data-url]')]
+        if not photos and (og_image := soup.find('meta', property='og:image')) and og_image.get('content'):
+            photos.append(og_image['content'])
+        # Убираем повторы с сохранением порядка; в медиагруппе не больше 10 фото
+        return tuple(dict.fromkeys(photos))[:MAX_PHOTOS]
+
     def _format_price(self, price):
         try:
             price_num = int(price.replace(" ", "").replace("₽", ""))
@@ -101,13 +216,41 @@ class AvitoParser:
         except (ValueError, AttributeError):
             return price
 
-    def parse(self, url):
-        cache_file = self._get_cache_filename(url)
-
-        # Если файл с кэшем существует, читаем из него
-        if os.path.exists(cache_file):
+    def _load_cached(self, cache_file):
+        try:
             with open(cache_file, "r", encoding="utf-8") as file:
-                return json.load(file)
+                data = json.load(file)
+        except FileNotFoundError:
+            return None
+        # В старых файлах кэша лежит готовая строка — такие перепарсиваем
+        if not isinstance(data, dict):
+            return None
+        try:
+            return Listing.from_dict(data)
+        except (KeyError, ValueError):
+            return None
+
+    def _store_cached(self, cache_file, listing):
+        # Создаем директорию для кэша при первой записи
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as file:
+            json.dump(listing.to_dict(), file, ensure_ascii=False)
+        os.replace(tmp_file, cache_file)
+
+    def cached_listing(self, url):
+        """Объявление из кэша в памяти или на диске, без обращения к сети; иначе None."""
+        if (listing := self.listings.get(url)) is not None:
+            return listing
+        if (listing := self._load_cached(self._get_cache_filename(url))) is not None:
+            self.listings.put(url, listing)
+        return listing
+
+    def parse_listing(self, url):
+        # Если объявление уже есть в кэше, сеть не трогаем
+        if (listing := self.cached_listing(url)) is not None:
+            return listing
+        cache_file = self._get_cache_filename(url)
 
         # Скачиваем HTML
         html = self._download_html(url)
@@ -117,51 +260,38 @@ class AvitoParser:
 
         # Извлекаем заголовок страницы
         title = soup.find('title').text if soup.find('title') else "Не указано"
-        self.type_estate = self._extract_type_estate(title)
+        type_estate = classify_estate_type(title)
 
         # Извлекаем цену
         price_span = soup.find('span', {'itemprop': 'price'})
-        self.price_value = price_span.get('content', 'Не указано') if price_span else 'Не указано'
-        self.price_value = self._format_price(self.price_value)
+        price_value = price_span.get('content', 'Не указано') if price_span else 'Не указано'
+        price_value = self._format_price(price_value)
 
         # Извлекаем параметры, если блок параметров существует
+        params = NO_PARAMS
         if params_block := soup.find('div', {'data-marker': 'item-view/item-params'}):
-            params_soup = BeautifulSoup(params_block.decode_contents(), 'html.parser')
-
-            # Извлекаем все параметры
-            for param in EstateParam:
-                value = self._extract_param(params_soup, param.param_name)
-                setattr(self, param.name.lower(), value)
+            params = tuple(self._extract_param(params_block, param.param_name) for param in ESTATE_PARAMS)
 
         # Извлекаем адрес
         address_element = soup.find('span', class_='style-item-address__string-wt61A')
-        self.full_address = address_element.text.strip() if address_element else "Не указано"
-        self.full_address = self._process_address(self.full_address)
+        full_address = address_element.text.strip() if address_element else "Не указано"
+        full_address = normalize_address(full_address)
 
-        # Формируем итоговую строку
-        result = []
-        result.append(f"🌟 <b>{self.type_estate}</b>")
-        result.append(f"💵 {self.price_value}₽\n")
-        result.append(f"⛳️ {self.full_address}\n")
+        listing = Listing(type_estate, price_value, full_address, params, self._extract_photos(soup))
 
-        # Динамически добавляем параметры, если они не None
-        for param in EstateParam:
-            value = getattr(self, param.name.lower())
-            if value is not None:
-                result.append(param.display_format.format(value))
+        # Сохраняем результат в кэш
+        self._store_cached(cache_file, listing)
+        self.listings.put(url, listing)
 
-        # Объединяем строки с переносами
-        result.append('\n\n')
-        result_str = "\n".join(result)
+        return listing
+
+    def parse(self, url):
+        return self.parse_listing(url).render()
 
-        # Сохраняем результат в кэш
-        with open(cache_file, "w", encoding="utf-8") as file:
-            json.dump(result_str, file, ensure_ascii=False)
 
-        return result_str
+parser = AvitoParser()
 
 
 if __name__ == "__main__":
     url0 = 'https://www.avito.ru/ekaterinburg/kvartiry/1-k._kvartira_406_m_69_et._4574477371?context=H4sIAAAAAAAA_wEmANn_YToxOntzOjE6IngiO3M6MTY6Ik9Ra1c5RzE3TUY5c0R2NW8iO32sRl6AJgAAAA'
-    parser = AvitoParser()
-    print(parser.parse(url0))
\ No newline at end of file
+    print(parser.parse(url0))
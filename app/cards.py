@@ -0,0 +1,125 @@
+import json
+import os
+from datetime import datetime, timezone
+from itertools import islice
+
+from app.loadenv import envi
+
+""" Модуль хранения опубликованных карточек: по одной JSON-записи на строку,
+файл только дописывается и читается потоково; для inline-поиска в памяти
+держатся строки поиска и смещения записей.
+"""
+
+
+class CardStore:
+    def __init__(self, path=os.path.join("cache", "cards.jsonl")):
+        self.path = path
+
+    def append(self, card):
+        """Дописывает карточку с отметкой времени; возвращает смещение её строки и запись."""
+        record = {"ts": datetime.now(timezone.utc).isoformat(timespec="seconds"), **card}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a+b") as file:
+            # Прошлая запись могла оборваться при сбое — начинаем с новой строки, чтобы не испортить эту
+            if file.seek(0, os.SEEK_END):
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b"\n":
+                    file.write(b"\n")
+            offset = file.tell()
+            file.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+        return offset, record
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def read(self, end=None):
+        """Записи со смещением начала строки в файле; end — граница чтения в байтах.
+
+        Читаем построчно, не загружая всю историю в память; оборванные
+        и испорченные строки пропускаются."""
+        try:
+            file = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        with file:
+            offset = 0
+            for line in file:
+                if end is not None and offset >= end:
+                    break
+                start, offset = offset, offset + len(line)
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict):
+                    yield start, record
+
+    def read_at(self, offsets):
+        """Записи по смещениям строк, полученным из read() или append()."""
+        records = []
+        with open(self.path, "rb") as file:
+            for offset in offsets:
+                file.seek(offset)
+                records.append(json.loads(file.readline()))
+        return records
+
+    def __iter__(self):
+        return (record for _, record in self.read())
+
+
+# Поля записи, по которым ищет inline-режим
+SEARCH_FIELDS = ("address", "district", "property_type", "price", "rooms", "area", "floor", "url")
+
+
+class CardIndex:
+    """Индекс карточек для поиска в inline-режиме, новые — первыми.
+
+    В памяти только строка поиска и смещение записи в хранилище: полные
+    карточки читаются с диска для найденной страницы."""
+
+    def __init__(self, store):
+        self.store = store
+        self._entries = None
+        # Карточки, добавленные во время загрузки истории; None — загрузка не идёт
+        self._pending = None
+
+    @property
+    def loaded(self):
+        return self._entries is not None
+
+    def begin_load(self):
+        self._pending = []
+
+    def read_entries(self, end=None):
+        # Чтение истории до смещения end — выполняется в потоке
+        return [(_search_key(card), offset) for offset, card in self.store.read(end)]
+
+    def finish_load(self, entries):
+        self._entries = entries + self._pending
+        self._pending = None
+
+    def add(self, offset, card):
+        if self._entries is not None:
+            self._entries.append((_search_key(card), offset))
+        elif self._pending is not None:
+            self._pending.append((_search_key(card), offset))
+
+    def search(self, query, offset=0, limit=20):
+        """Смещения страницы карточек, содержащих все слова запроса, и смещение следующей страницы (или None)."""
+        words = query.lower().split()
+        matches = (position for key, position in reversed(self._entries) if all(word in key for word in words))
+        page = list(islice(matches, offset, offset + limit + 1))
+        return page[:limit], (offset + limit if len(page) > limit else None)
+
+
+def _search_key(card):
+    return " ".join(str(card.get(field) or "") for field in SEARCH_FIELDS).lower()
+
+
+card_store = CardStore(envi.cards_path)
+card_index = CardIndex(card_store)
@@ -0,0 +1,124 @@
+import argparse
+import csv
+import importlib.util
+from datetime import date, datetime
+from itertools import islice
+
+from app.cards import card_store
+
+""" Модуль выгрузки опубликованных карточек в CSV или Parquet. Записи идут
+из хранилища потоком через цепочку генераторов (фильтр → пачки → запись),
+поэтому память не зависит от объёма истории.
+
+Запуск из консоли: python -m app.export -f csv --since 2025-01-01 --district ВИЗ -o cards.csv
+"""
+
+EXPORT_FIELDS = (
+    "ts", "source", "address", "district", "property_type", "price", "floor", "area", "rooms",
+    "name", "phone", "author_id", "author_username", "url",
+)
+FORMATS = ("csv", "parquet")
+CHUNK_SIZE = 1000
+
+
+def available_formats():
+    """Форматы, доступные в этой установке: Parquet — только если установлен pyarrow."""
+    return tuple(fmt for fmt in FORMATS if fmt != "parquet" or importlib.util.find_spec("pyarrow"))
+
+
+def _parse_date(value):
+    if value is None or isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
+def filter_cards(cards, since=None, until=None, district=None, author=None):
+    """Отбирает карточки по дате публикации (включительно), району и автору (id или username)."""
+    since, until = _parse_date(since), _parse_date(until)
+    author = author.lstrip("@").lower() if author else None
+    for card in cards:
+        if since or until:
+            published = datetime.fromisoformat(card["ts"]).date()
+            if (since and published < since) or (until and published > until):
+                continue
+        if district and card.get("district") != district:
+            continue
+        if author and author not in (str(card.get("author_id")), (card.get("author_username") or "").lower()):
+            continue
+        yield card
+
+
+def chunked(records, size=CHUNK_SIZE):
+    records = iter(records)
+    while chunk := list(islice(records, size)):
+        yield chunk
+
+
+def write_csv(chunks, path):
+    count = 0
+    with open(path, "w", encoding="utf-8-sig", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for chunk in chunks:
+            writer.writerows(chunk)
+            count += len(chunk)
+    return count
+
+
+def write_parquet(chunks, path):
+    # pyarrow — необязательная зависимость, нужна только для Parquet
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Для выгрузки в Parquet установите пакет pyarrow") from None
+
+    schema = pa.schema([
+        (field, pa.int64() if field == "author_id" else pa.string()) for field in EXPORT_FIELDS
+    ])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in chunks:
+            rows = [
+                {field: _parquet_value(field, card.get(field)) for field in EXPORT_FIELDS}
+                for card in chunk
+            ]
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            count += len(chunk)
+    return count
+
+
+def _parquet_value(field, value):
+    if value is None:
+        return None
+    return int(value) if field == "author_id" else str(value)
+
+
+def export_cards(path, fmt="csv", store=card_store, chunk_size=CHUNK_SIZE, **filters):
+    """Выгружает отфильтрованные карточки в файл path и возвращает их число."""
+    formats = available_formats()
+    if fmt not in formats:
+        reason = "установите пакет pyarrow" if fmt in FORMATS else "неизвестный формат"
+        raise ValueError(f"Формат {fmt!r} недоступен ({reason}), доступны: {', '.join(formats)}")
+    chunks = chunked(filter_cards(store, **filters), chunk_size)
+    return write_parquet(chunks, path) if fmt == "parquet" else write_csv(chunks, path)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Выгрузка опубликованных карточек")
+    arg_parser.add_argument("-f", "--format", choices=available_formats(), default="csv")
+    arg_parser.add_argument("-o", "--output", help="файл выгрузки, по умолчанию cards.<формат>")
+    arg_parser.add_argument("--since", help="с даты публикации, ГГГГ-ММ-ДД")
+    arg_parser.add_argument("--until", help="по дату публикации, ГГГГ-ММ-ДД")
+    arg_parser.add_argument("--district")
+    arg_parser.add_argument("--author", help="id или username автора")
+    args = arg_parser.parse_args()
+
+    output = args.output or f"cards.{args.format}"
+    count = export_cards(output, args.format, since=args.since, until=args.until,
+                         district=args.district, author=args.author)
+    print(f"Выгружено карточек: {count} → {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from app.loadenv import envi
+
+""" Модуль загрузки страниц: повторы с экспоненциальной задержкой и джиттером,
+предохранитель (circuit breaker) на каждый хост и необязательная ротация
+прокси и user-agent с учётом их «здоровья».
+"""
+
+DEFAULT_USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+]
+
+# Ответы, после которых имеет смысл повторить запрос
+RETRY_STATUSES = frozenset({403, 408, 429, 500, 502, 503, 504})
+
+
+class FetchError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class CircuitOpenError(FetchError):
+    pass
+
+
+class CircuitBreaker:
+    """Предохранитель хоста: после threshold ошибок подряд размыкается на reset_timeout
+    секунд и сразу отклоняет запросы; затем пропускает одну пробную попытку."""
+
+    def __init__(self, threshold=5, reset_timeout=60.0, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._open_until = None
+        self._probing = False
+
+    @property
+    def is_open(self):
+        with self._lock:
+            return self._open_until is not None and self._clock() < self._open_until
+
+    def allow(self):
+        with self._lock:
+            if self._open_until is None:
+                return True
+            if self._clock() < self._open_until or self._probing:
+                return False
+            # Полуоткрытое состояние: пропускаем одну пробную попытку
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._open_until = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.threshold:
+                self._open_until = self._clock() + self.reset_timeout
+            self._probing = False
+
+    def hold(self, seconds):
+        """Размыкает предохранитель минимум на seconds секунд — например, по Retry-After."""
+        with self._lock:
+            until = self._clock() + seconds
+            self._open_until = until if self._open_until is None else max(self._open_until, until)
+            self._probing = False
+
+
+class HealthPool:
+    """Пул прокси или user-agent: выбор взвешен по скользящей оценке успешности."""
+
+    def __init__(self, items, decay=0.7, min_weight=0.05, rnd=None):
+        self._scores = {item: 1.0 for item in items}
+        self.decay = decay
+        self.min_weight = min_weight
+        self._rnd = rnd or random.Random()
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return bool(self._scores)
+
+    def score(self, item):
+        with self._lock:
+            return self._scores[item]
+
+    def pick(self):
+        with self._lock:
+            if not self._scores:
+                return None
+            items = list(self._scores)
+            # Минимальный вес оставляет «больным» элементам шанс восстановиться
+            weights = [max(self._scores[item], self.min_weight) for item in items]
+        return self._rnd.choices(items, weights=weights)[0]
+
+    def report(self, item, ok):
+        if item is None:
+            return
+        with self._lock:
+            if item in self._scores:
+                self._scores[item] = self._scores[item] * self.decay + (1.0 - self.decay) * ok
+
+
+class Fetcher:
+    def __init__(self, retries=3, backoff=0.5, max_backoff=8.0, timeout=(5, 15),
+                 proxies=None, user_agents=None, breaker_threshold=5, breaker_reset=60.0,
+                 sleep=time.sleep, clock=time.monotonic, rnd=None):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self._rnd = rnd or random.Random()
+        self.proxies = HealthPool(proxies or [], rnd=self._rnd)
+        self.user_agents = HealthPool(user_agents or DEFAULT_USER_AGENTS, rnd=self._rnd)
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self._sleep = sleep
+        self._clock = clock
+        self._breakers = {}
+        self._breakers_lock = threading.Lock()
+        self._local = threading.local()
+
+    def breaker(self, url):
+        host = urlsplit(url).netloc
+        with self._breakers_lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(self.breaker_threshold, self.breaker_reset, self._clock)
+            return self._breakers[host]
+
+    def _session(self):
+        # requests.Session не потокобезопасен — держим по сессии на поток
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return retry_after
+        # Экспоненциальная задержка с полным джиттером
+        return self._rnd.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def get(self, url):
+        breaker = self.breaker(url)
+        error = None
+        for attempt in range(self.retries + 1):
+            if not breaker.allow():
+                raise CircuitOpenError("Avito временно недоступен, попробуйте позже") from error
+
+            proxy = self.proxies.pick()
+            user_agent = self.user_agents.pick()
+            retry_after = None
+            try:
+                response = self._session().get(
+                    url,
+                    headers={"User-Agent": user_agent},
+                    proxies={"http": proxy, "https": proxy} if proxy else None,
+                    timeout=self.timeout,
+                )
+            except requests.RequestException as e:
+                error = FetchError(f"Ошибка при загрузке страницы: {e}")
+                self.proxies.report(proxy, False)
+            else:
+                if response.status_code == 200:
+                    breaker.record_success()
+                    self.proxies.report(proxy, True)
+                    self.user_agents.report(user_agent, True)
+                    return response.text
+
+                error = FetchError(f"Ошибка при загрузке страницы: {response.status_code}", response.status_code)
+                if response.status_code not in RETRY_STATUSES:
+                    # Ошибка самого запроса (например, 404) — хост исправен, повторять бессмысленно
+                    breaker.record_success()
+                    raise error
+                # 403/429 — признак блокировки: штрафуем и прокси, и user-agent
+                blocked = response.status_code in (403, 429)
+                self.proxies.report(proxy, not blocked)
+                self.user_agents.report(user_agent, not blocked)
+                retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+                if retry_after is not None and retry_after > self.max_backoff:
+                    # Хост просит подождать дольше, чем мы готовы ждать между попытками:
+                    # не повторяем раньше срока, а до его истечения отклоняем запросы к хосту
+                    breaker.hold(retry_after)
+                    raise error
+
+            breaker.record_failure()
+            if attempt < self.retries:
+                self._sleep(self._delay(attempt, retry_after))
+        raise error
+
+
+def _parse_retry_after(value):
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+fetcher = Fetcher(proxies=envi.proxies, user_agents=envi.user_agents)
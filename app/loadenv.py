@@ -11,11 +11,33 @@ from dotenv import load_dotenv
 
 class Envi:
     def __init__(self) -> None:
-        load_dotenv()
-        env_path = Path(".") / ".env"
-        load_dotenv(dotenv_path=env_path)
+        # Читаем .env один раз: из рабочего каталога, иначе из корня проекта
+        for env_path in (Path(".") / ".env", Path(__file__).resolve().parent.parent / ".env"):
+            if env_path.is_file():
+                load_dotenv(dotenv_path=env_path)
+                break
         self.token = os.getenv("TOKEN")
         self.chid = os.getenv("CHANNEL_ID")
+        # Telegram id администраторов через запятую — им доступна команда /export
+        self.admin_ids = _parse_ids(os.getenv("ADMIN_IDS"))
+        # Telegram id агентов через запятую — им доступен inline-режим; администраторы входят сюда же
+        self.agent_ids = _parse_ids(os.getenv("AGENT_IDS")) | self.admin_ids
+        # Необязательные пулы для загрузки Avito: прокси через запятую,
+        # user-agent через "|" (в самих строках user-agent встречаются запятые)
+        self.proxies = _split_list(os.getenv("AVITO_PROXIES"), ",")
+        self.user_agents = _split_list(os.getenv("AVITO_USER_AGENTS"), "|")
+        # Опубликованные карточки и file_id загруженных фото — постоянные данные,
+        # в контейнере их кладут на том, а не в одноразовый кэш
+        self.cards_path = os.getenv("CARDS_PATH") or os.path.join("cache", "cards.jsonl")
+        self.file_ids_path = os.getenv("FILE_IDS_PATH") or os.path.join("cache", "file_ids.json")
+
+
+def _split_list(value, separator):
+    return [item.strip() for item in (value or "").split(separator) if item.strip()]
+
+
+def _parse_ids(value):
+    return {int(item) for item in _split_list(value, ",") if item.lstrip("-").isdigit()}
 
 
 envi = Envi()
\ No newline at end of file
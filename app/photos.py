@@ -0,0 +1,180 @@
+import asyncio
+import json
+import os
+
+import aiohttp
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InputFile, InputMediaPhoto
+
+from app.loadenv import envi
+
+""" Модуль публикации карточки с фотографиями галереи: изображения скачиваются
+параллельно с ограничением размера и потоком передаются прямо в загрузку
+в Telegram, а полученные file_id кэшируются по URL изображения.
+"""
+
+# Ограничение Telegram на загружаемое фото
+MAX_PHOTO_BYTES = 10 * 1024 * 1024
+# Ограничение Telegram на длину подписи к медиа
+MAX_CAPTION_LENGTH = 1024
+
+
+class PhotoTooLarge(Exception):
+    pass
+
+
+class CappedURLFile(InputFile):
+    """Фото по URL: запрос открывается заранее через open(), где и проверяется
+    размер, а тело потоком отдаётся в загрузку без буферизации всего файла."""
+
+    def __init__(self, url, max_bytes=MAX_PHOTO_BYTES, filename="photo.jpg"):
+        super().__init__(filename=filename)
+        self.url = url
+        self.max_bytes = max_bytes
+        self._response = None
+        self._head = b""
+
+    async def open(self, session):
+        response = await session.get(self.url)
+        try:
+            response.raise_for_status()
+            if response.content_length is None:
+                # Размер неизвестен — читаем наперёд не больше лимита: ошибка внутри
+                # загрузки в Telegram дошла бы до нас только как сетевой сбой
+                try:
+                    self._head = await response.content.readexactly(self.max_bytes + 1)
+                except asyncio.IncompleteReadError as e:
+                    # Файл кончился раньше лимита — он целиком в памяти
+                    self._head = e.partial
+                if len(self._head) > self.max_bytes:
+                    raise PhotoTooLarge(f"{self.url}: больше {self.max_bytes} байт")
+            elif response.content_length > self.max_bytes:
+                raise PhotoTooLarge(f"{self.url}: {response.content_length} байт")
+        except Exception:
+            response.release()
+            raise
+        self._response = response
+        return self
+
+    async def read(self, bot):
+        response, self._response = self._response, None
+        if response is None:
+            raise RuntimeError(f"{self.url}: файл не открыт")
+        head, self._head = self._head, b""
+        try:
+            if head:
+                yield head
+            # Остаток тела ограничен: Content-Length проверен в open(), а без него файл уже прочитан
+            async for chunk in response.content.iter_chunked(self.chunk_size):
+                yield chunk
+        finally:
+            response.release()
+
+    def close(self):
+        self._head = b""
+        if self._response is not None:
+            self._response.release()
+            self._response = None
+
+
+class FileIdCache:
+    """Кэш file_id загруженных в Telegram фото по URL изображения, хранится в JSON."""
+
+    def __init__(self, path=os.path.join("cache", "file_ids.json")):
+        self.path = path
+        self._file_ids = None
+
+    def _load(self):
+        if self._file_ids is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as file:
+                    self._file_ids = json.load(file)
+            except (FileNotFoundError, ValueError):
+                self._file_ids = {}
+        return self._file_ids
+
+    def get(self, url):
+        return self._load().get(url)
+
+    def update(self, file_ids):
+        if not file_ids:
+            return
+        self._load().update(file_ids)
+        self._save()
+
+    def discard(self, urls):
+        file_ids = self._load()
+        for url in urls:
+            file_ids.pop(url, None)
+        self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self._file_ids, file, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+file_id_cache = FileIdCache(envi.file_ids_path)
+
+_http_session = None
+
+
+def _session():
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60, sock_connect=10))
+    return _http_session
+
+
+async def _open_uploads(urls, max_bytes):
+    """Параллельно открывает загрузки; недоступные и слишком большие фото пропускаются."""
+    files = [CappedURLFile(url, max_bytes) for url in urls]
+    results = await asyncio.gather(*(file.open(_session()) for file in files), return_exceptions=True)
+    return {file.url: file for file, result in zip(files, results) if not isinstance(result, BaseException)}
+
+
+async def _send_media(bot, chat_id, text, media, disable_web_page_preview):
+    caption = text if len(text) <= MAX_CAPTION_LENGTH else None
+    if caption is not None:
+        media[0].caption = caption
+    if len(media) == 1:
+        messages = [await bot.send_photo(chat_id, media[0].media, caption=caption)]
+    else:
+        messages = await bot.send_media_group(chat_id, media)
+    if caption is None:
+        # Текст длиннее подписи — отправляем его отдельным сообщением после фото
+        await bot.send_message(chat_id, text, disable_web_page_preview=disable_web_page_preview)
+    return messages
+
+
+async def send_card(bot, chat_id, text, photo_urls=(), max_bytes=MAX_PHOTO_BYTES, disable_web_page_preview=True):
+    """Публикует карточку: медиагруппой с подписью, если есть фото, иначе текстом."""
+    photo_urls = list(photo_urls)
+    cached = {url: file_id for url in photo_urls if (file_id := file_id_cache.get(url))}
+    uploads = await _open_uploads([url for url in photo_urls if url not in cached], max_bytes)
+    urls = [url for url in photo_urls if url in cached or url in uploads]
+
+    if not urls:
+        return [await bot.send_message(chat_id, text, disable_web_page_preview=disable_web_page_preview)]
+
+    media = [InputMediaPhoto(media=cached.get(url) or uploads[url]) for url in urls]
+    try:
+        messages = await _send_media(bot, chat_id, text, media, disable_web_page_preview)
+    except TelegramBadRequest:
+        if not cached:
+            raise
+        # Telegram мог не принять устаревшие file_id — забываем их и загружаем фото заново
+        file_id_cache.discard(cached)
+        return await send_card(bot, chat_id, text, photo_urls, max_bytes, disable_web_page_preview)
+    finally:
+        for file in uploads.values():
+            file.close()
+
+    file_id_cache.update({
+        url: message.photo[-1].file_id
+        for url, message in zip(urls, messages)
+        if url in uploads and message.photo
+    })
+    return messages
@@ -0,0 +1,151 @@
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+""" Модуль упреждающей загрузки объявлений Avito: как только в сообщении
+появляется ссылка на объявление, загрузка и разбор запускаются в ограниченном
+пуле потоков, а результат попадает в кэш объявлений парсера. Обработчик потом
+только дожидается готового или уже идущего результата.
+"""
+
+# Ссылка на объявление: в пути есть числовой id после подчёркивания
+AVITO_LISTING_RE = re.compile(r'https?://(?:www\.|m\.)?avito\.ru/[^\s<>"]*_\d{6,}[^\s<>"]*')
+
+
+def extract_avito_urls(message):
+    """URL объявлений Avito из текста, подписи и ссылок-сущностей сообщения."""
+    urls = []
+    for text, entities in ((message.text, message.entities), (message.caption, message.caption_entities)):
+        if text:
+            urls.extend(AVITO_LISTING_RE.findall(text))
+        for entity in entities or ():
+            if entity.type == "text_link" and AVITO_LISTING_RE.fullmatch(entity.url or ""):
+                urls.append(entity.url)
+    return list(dict.fromkeys(urls))
+
+
+class Download(NamedTuple):
+    task: asyncio.Future
+    # Время старта и id обновления, из-за которого загрузка началась
+    started: float
+    origin: object
+    # Будущее в пуле упреждающих загрузок или None для загрузки по запросу
+    pooled: object = None
+
+    @property
+    def speculative(self):
+        return self.pooled is not None
+
+
+class Prefetcher:
+    def __init__(self, load, max_workers=4, max_pending=32, history=1024):
+        self._load = load
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self.max_pending = max_pending
+        self.history = history
+        # Идущие загрузки: url -> Download
+        self._tasks = {}
+        # Завершённые упреждающие загрузки: url -> длительность загрузки
+        self._prefetched = OrderedDict()
+        self.counters = {"prefetched": 0, "dropped": 0, "ready": 0, "in_flight": 0, "misses": 0}
+        self.saved_seconds = 0.0
+
+    def _start(self, url, speculative, origin=None):
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        if speculative:
+            pooled = self._executor.submit(self._load, url)
+            task = asyncio.wrap_future(pooled)
+        else:
+            # Загрузку по запросу обработчика не ставим в очередь за упреждающими
+            pooled = None
+            task = asyncio.ensure_future(loop.run_in_executor(None, self._load, url))
+        self._tasks[url] = Download(task, started, origin, pooled)
+
+        def done(task):
+            # Отменённую в очереди загрузку могла уже заменить загрузка по запросу
+            if url in self._tasks and self._tasks[url].task is task:
+                del self._tasks[url]
+            if task.cancelled() or task.exception() is not None:
+                return
+            if speculative:
+                self._prefetched[url] = time.perf_counter() - started
+                self._prefetched.move_to_end(url)
+                while len(self._prefetched) > self.history:
+                    self._prefetched.popitem(last=False)
+
+        task.add_done_callback(done)
+        return task
+
+    def prefetch(self, url, origin=None):
+        """Запускает упреждающую загрузку, если её ещё нет и пул не переполнен."""
+        if url in self._tasks or url in self._prefetched:
+            return
+        if len(self._tasks) >= self.max_pending:
+            self.counters["dropped"] += 1
+            return
+        self.counters["prefetched"] += 1
+        self._start(url, speculative=True, origin=origin)
+
+    def pending(self, url):
+        """Уже идущая загрузка url или None — новую не запускает."""
+        download = self._tasks.get(url)
+        return download.task if download else None
+
+    async def wait(self, url, timeout):
+        """Результат уже идущей загрузки url, если она успеет за timeout, иначе None."""
+        deadline = time.perf_counter() + timeout
+        while (task := self.pending(url)) is not None:
+            try:
+                return await asyncio.wait_for(asyncio.shield(task), max(deadline - time.perf_counter(), 0))
+            except asyncio.CancelledError:
+                # Загрузку сняли с очереди пула и перезапустили по запросу — ждём новую
+                if not task.cancelled():
+                    raise
+            except Exception:
+                return None
+        return None
+
+    async def get(self, url, origin=None):
+        """Объявление для обработчика: готовое, уже загружаемое или загруженное сейчас.
+
+        origin — id текущего обновления: упреждающая загрузка, начатая им же,
+        попаданием не считается."""
+        download = self._tasks.get(url)
+        if download is not None and download.speculative and download.pooled.cancel():
+            # Загрузка ещё ждёт свободного потока в пуле — запускаем её сразу без очереди
+            download = None
+        if download is not None:
+            task = download.task
+            if download.speculative and download.origin != origin:
+                self.counters["in_flight"] += 1
+                self.saved_seconds += time.perf_counter() - download.started
+            else:
+                self.counters["misses"] += 1
+        elif url in self._prefetched:
+            self.counters["ready"] += 1
+            self.saved_seconds += self._prefetched[url]
+            # Результат уже в кэше объявлений — загрузка вернёт его без сети
+            task = self._start(url, speculative=False)
+        else:
+            self.counters["misses"] += 1
+            task = self._start(url, speculative=False)
+        return await task
+
+    def stats(self):
+        hits = self.counters["ready"] + self.counters["in_flight"]
+        requests = hits + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": hits / requests if requests else 0.0,
+            "saved_seconds": self.saved_seconds,
+        }
+
+    def render_stats(self):
+        stats = self.stats()
+        return (f"⚡️ Упреждающая загрузка: попаданий {stats['hit_rate']:.0%} "
+                f"(готово {stats['ready']}, в процессе {stats['in_flight']}, промахов {stats['misses']}), "
+                f"сэкономлено {stats['saved_seconds']:.1f} с")
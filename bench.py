@@ -0,0 +1,88 @@
+""" Бенчмарк классификатора типа недвижимости и нормализатора адреса
+на большом синтетическом наборе заголовков и адресов.
+
+Запуск: python bench.py [количество]; завершается с ошибкой, если классификатор
+медленнее исходного перебора подстрок.
+"""
+import random
+import sys
+import time
+
+from app.avito_parser import ESTATE_TYPES, classify_estate_type, normalize_address
+
+TITLES = [
+    "1-к. квартира, 40,6 м², 6/9 эт.",
+    "Квартира-студия, 25 м², 3/25 эт.",
+    "Своб. планировка, 52 м², 10/16 эт.",
+    "Комната 18 м² в 3-к., 2/5 эт.",
+    "Дом 120 м² на участке 6 сот.",
+    "Дача 40 м² на участке 8 сот.",
+    "Коттедж 250 м² на участке 12 сот.",
+    "Таунхаус 140 м² на участке 2 сот.",
+    "Участок 10 сот. (ИЖС)",
+    "Участок 6 сот. (СНТ, ДНП)",
+    "Гараж, 18 м²",
+    "Машиноместо, 13 м²",
+    "Офис, 80 м²",
+]
+
+ADDRESS_PARTS = [
+    "Свердловская область", "Екатеринбург", "Академический р-н", "ул. Ленина", "пр-т Космонавтов",
+    "Билимбаевская ул.", "улица Вильгельма де Геннина", "Широкая речка", "мкр. Солнечный",
+]
+
+
+def reference_classify(title):
+    # Исходный линейный перебор подстрок со сборкой словаря на каждый вызов — для сверки
+    estate_types_mapping = dict(ESTATE_TYPES)
+    for search_string, estate_type in estate_types_mapping.items():
+        if search_string in title:
+            return estate_type
+    return "Не указано"
+
+
+def synthetic_titles(count, rnd):
+    suffix = " на продажу в Екатеринбурге | Недвижимость | Авито"
+    return [rnd.choice(TITLES) + suffix for _ in range(count)]
+
+
+def synthetic_addresses(count, rnd):
+    addresses = []
+    for _ in range(count):
+        parts = rnd.sample(ADDRESS_PARTS, rnd.randint(0, 4))
+        if rnd.random() < 0.7:
+            parts.append(str(rnd.randint(1, 200)))
+        addresses.append(", ".join(parts))
+    return addresses
+
+
+def measure(name, func, items):
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    elapsed = time.perf_counter() - start
+    rate = len(items) / elapsed
+    print(f"{name:<28} {rate:>12,.0f} шт/с  ({elapsed:.3f} с)")
+    return rate
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rnd = random.Random(51)
+    titles = synthetic_titles(count, rnd)
+    addresses = synthetic_addresses(count, rnd)
+
+    mismatches = sum(classify_estate_type(t) != reference_classify(t) for t in titles)
+    if mismatches:
+        raise SystemExit(f"Классификатор расходится с эталоном в {mismatches} заголовках")
+
+    reference_rate = measure("перебор подстрок (эталон)", reference_classify, titles)
+    classify_rate = measure("classify_estate_type", classify_estate_type, titles)
+    measure("normalize_address", normalize_address, addresses)
+
+    if classify_rate < reference_rate:
+        raise SystemExit("classify_estate_type медленнее исходного перебора")
+
+
+if __name__ == "__main__":
+    main()
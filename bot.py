@@ -1,14 +1,27 @@
+import time
+
+# Отметка старта процесса — для замера времени холодного запуска
+STARTED_AT = time.perf_counter()
+
 import asyncio
 import contextlib
+import hashlib
+import os
+import shlex
+import tempfile
 from aiogram import Bot, Dispatcher, types, F
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.context import FSMContext
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
+from aiogram.types import (InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery, InlineQuery,
+                           InlineQueryResultArticle, InlineQueryResultsButton, InputTextMessageContent,
+                           LinkPreviewOptions, FSInputFile)
 from app.loadenv import envi
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from app.avito_parser import AvitoParser
+from app.photos import send_card
+from app.cards import card_index, card_store
+from app.prefetch import AVITO_LISTING_RE, Prefetcher, extract_avito_urls
 
 CHANNEL_ID = envi.chid
 
@@ -18,6 +31,108 @@ bot = Bot(
 )
 dp = Dispatcher()
 
+
+AVITO_URL_PREFIXES = ("https://www.avito.ru/", "http://www.avito.ru/")
+
+
+def get_parser():
+    # Парсер тянет requests и bs4 — импортируем его при первом обращении, а не при старте бота
+    from app.avito_parser import parser
+    return parser
+
+
+def parse_listing(url):
+    return get_parser().parse_listing(url)
+
+
+# Загрузки объявлений: упреждающие — как только ссылка появилась в сообщении,
+# повторные запросы того же URL ждут одну загрузку
+prefetcher = Prefetcher(parse_listing)
+
+
+@dp.message.outer_middleware()
+async def prefetch_avito_links(handler, message: types.Message, data):
+    # Срабатывает до фильтров: на любые сообщения, в том числе пересланные.
+    # Ссылку, которую ждёт /avito, загрузит сам обработчик — без очереди упреждающего пула
+    if data.get("raw_state") != AvitoState.url.state:
+        for url in extract_avito_urls(message):
+            prefetcher.prefetch(url, origin=data["event_update"].update_id)
+    return await handler(message, data)
+
+
+_price_stats_task = None
+# Карточки, опубликованные, пока история для статистики ещё загружается
+_unloaded_cards = []
+
+
+def load_price_stats(end):
+    # NumPy тоже импортируем при первом обращении; статистику поднимаем из истории карточек
+    from app.analytics import PriceStats
+    return PriceStats(districts, property_types).load(record for _, record in card_store.read(end))
+
+
+async def _load_price_stats():
+    # Историю читаем до текущего конца файла, а карточки, опубликованные во время загрузки, досчитываем
+    # после неё: так ни одна не попадёт в статистику дважды
+    _unloaded_cards.clear()
+    price_stats = await asyncio.to_thread(load_price_stats, card_store.size())
+    price_stats.load(_unloaded_cards)
+    _unloaded_cards.clear()
+    return price_stats
+
+
+def _shared_task(task, load):
+    # Одна загрузка на всех; неудавшуюся при следующем обращении запускаем заново
+    if task is None or (task.done() and (task.cancelled() or task.exception() is not None)):
+        return asyncio.ensure_future(load())
+    return task
+
+
+def get_price_stats():
+    """Задача загрузки статистики цен: одна на всех, в потоке, чтобы не блокировать цикл событий."""
+    global _price_stats_task
+    _price_stats_task = _shared_task(_price_stats_task, _load_price_stats)
+    return _price_stats_task
+
+
+def loaded_price_stats():
+    """Статистика цен, если она уже загружена, иначе None — загрузка при этом идёт в фоне."""
+    task = get_price_stats()
+    if task.done() and not task.cancelled() and task.exception() is None:
+        return task.result()
+    return None
+
+
+_card_index_task = None
+
+
+async def _load_card_index():
+    # Как и статистика: история до текущего конца файла в потоке, новые карточки — после
+    card_index.begin_load()
+    card_index.finish_load(await asyncio.to_thread(card_index.read_entries, card_store.size()))
+    return card_index
+
+
+def get_card_index():
+    """Задача загрузки индекса inline-поиска: одна на всех, в потоке."""
+    global _card_index_task
+    _card_index_task = _shared_task(_card_index_task, _load_card_index)
+    return _card_index_task
+
+
+def publish_record(card):
+    """Сохраняет опубликованную карточку, добавляет её в индекс поиска и статистику цен."""
+    offset, record = card_store.append(card)
+    card_index.add(offset, record)
+    # Статистика необязательна: публикация её не ждёт
+    price_stats = loaded_price_stats()
+    if price_stats is not None:
+        price_stats.add(card.get("price"), card.get("area"), card.get("rooms"),
+                        card.get("district"), card.get("property_type"))
+    else:
+        _unloaded_cards.append(card)
+
+
 class Form(StatesGroup):
     address = State()
     district = State()
@@ -50,6 +165,9 @@ districts = [
 
 property_types = ["Квартира", "Студия", "Апартаменты", "Дом", "Комната", "Общежитие"]
 
+# Поля карточки из анкеты /new, которые сохраняются в хранилище
+CARD_FIELDS = ("address", "district", "property_type", "price", "floor", "area", "rooms", "name", "phone")
+
 def get_inline_keyboard(options, callback_prefix):
     keyboard = []
     row = []
@@ -70,6 +188,51 @@ def get_inline_keyboard(options, callback_prefix):
 async def start_command(message: types.Message):
     await message.answer("Чтобы добавить карточку, нажмите МЕНЮ и выберите 'Создать новую карточку'.")
 
+@dp.message(Command("stats"))
+async def stats_command(message: types.Message, command: CommandObject):
+    # Необязательный аргумент — тип жилья: /stats Квартира
+    property_type = command.args.strip() if command.args else None
+    try:
+        summary = (await get_price_stats()).render_summary(property_type)
+    except Exception as e:
+        summary = f"❌ Статистика недоступна: {e}"
+    await message.answer(f"{summary}\n\n{prefetcher.render_stats()}")
+
+@dp.message(Command("export"))
+async def export_command(message: types.Message, command: CommandObject):
+    # /export [csv|parquet] [since=ГГГГ-ММ-ДД] [until=ГГГГ-ММ-ДД] [district="Широкая речка"] [author=username]
+    if message.from_user.id not in envi.admin_ids:
+        await message.answer("⛔ Команда доступна только администраторам.")
+        return
+
+    from app.export import FORMATS, available_formats, export_cards
+    fmt, filters = "csv", {}
+    try:
+        for arg in shlex.split(command.args or ""):
+            key, sep, value = arg.partition("=")
+            if not sep and key in FORMATS:
+                if key not in available_formats():
+                    raise ValueError(f"Формат {key} недоступен на этом сервере")
+                fmt = key
+            elif key in ("since", "until", "district", "author") and value:
+                filters[key] = value
+            else:
+                raise ValueError(f"Непонятный параметр: {arg}")
+    except ValueError as e:
+        await message.answer(f"❌ {e}")
+        return
+
+    fd, path = tempfile.mkstemp(suffix=f".{fmt}")
+    os.close(fd)
+    try:
+        count = await asyncio.to_thread(export_cards, path, fmt, **filters)
+        await message.answer_document(FSInputFile(path, filename=f"cards.{fmt}"),
+                                      caption=f"📦 Выгружено карточек: {count}")
+    except (ValueError, RuntimeError) as e:
+        await message.answer(f"❌ Ошибка выгрузки: {e}")
+    finally:
+        os.remove(path)
+
 @dp.message(Command("new"))
 async def new_command(message: types.Message, state: FSMContext):
     await state.clear()
@@ -87,11 +250,11 @@ async def avito_command(message: types.Message, state: FSMContext):
 
 # Обработчик ввода ссылки с валидацией
 @dp.message(AvitoState.url)
-async def get_avito_url(message: types.Message, state: FSMContext):
+async def get_avito_url(message: types.Message, state: FSMContext, event_update: types.Update):
     url = message.text.strip()  # Получаем ссылку
 
     # Валидация ссылки
-    if not url.startswith(("https://www.avito.ru/", "http://www.avito.ru/")):
+    if not url.startswith(AVITO_URL_PREFIXES):
         await message.answer("❌ Ссылка должна вести на объявление Avito. Попробуйте ещё раз:")
         return  # Останавливаем выполнение, если ссылка невалидна
 
@@ -99,9 +262,12 @@ async def get_avito_url(message: types.Message, state: FSMContext):
 
     # Парсим объявление
     try:
-        parser = AvitoParser()
-        parsed_data = f'{parser.parse(url)}<a href="{url}">🔗 Переход на объявление</a>'
-        await state.update_data(parsed_data=parsed_data)  # Сохраняем результат парсинга
+        # Парсер без состояния — выполняем блокирующую загрузку в потоке, не останавливая цикл событий
+        # Загрузка обычно уже запущена упреждающе — дожидаемся её результата
+        listing = await prefetcher.get(url, origin=event_update.update_id)
+        parsed_data = f'{listing.render()}<a href="{url}">🔗 Переход на объявление</a>'
+        # Сохраняем результат парсинга
+        await state.update_data(parsed_data=parsed_data, photos=list(listing.photos), card=listing.card_fields())
 
         # Показываем результат и запрашиваем имя
         await message.answer(f"📄 Результат парсинга:\n\n{parsed_data}", disable_web_page_preview=True)
@@ -139,12 +305,93 @@ async def get_avito_phone(message: types.Message, state: FSMContext):
         f"<span class='tg-spoiler'>{user_link}</span>"  # Добавляем ссылку на автора
     )
 
-    # Отправляем сообщение в канал
-    await bot.send_message(CHANNEL_ID, result, parse_mode="HTML", disable_web_page_preview=True)
+    # Отправляем в канал медиагруппой с фото объявления (или текстом, если фото нет)
+    await send_card(bot, CHANNEL_ID, result, data.get('photos', []))
+    publish_record({
+        "source": "avito",
+        "url": data.get('url'),
+        "district": None,
+        **data.get('card', {}),
+        "name": data.get('name'),
+        "phone": phone,
+        "author_id": message.from_user.id,
+        "author_username": message.from_user.username,
+        "text": result,
+    })
     await message.answer("✅ Объявление отправлено в канал!")
     await state.clear()  # Очищаем состояние    
 
 
+# Inline-режим: @bot <ссылка Avito> — карточка объявления, @bot <запрос> — поиск по опубликованным
+INLINE_PAGE_SIZE = 20
+# Сколько inline-ответ ждёт загрузку объявления, которого ещё нет в кэше
+INLINE_FETCH_WAIT = 0.5
+
+def listing_article(url, listing):
+    return InlineQueryResultArticle(
+        id=hashlib.md5(url.encode()).hexdigest(),
+        title=f"{listing.type_estate}, {listing.price_value}₽",
+        description=listing.full_address.replace("\n 📍", ","),
+        thumbnail_url=listing.photos[0] if listing.photos else None,
+        input_message_content=InputTextMessageContent(
+            message_text=f'{listing.render()}<a href="{url}">🔗 Переход на объявление</a>',
+            link_preview_options=LinkPreviewOptions(is_disabled=True),
+        ),
+    )
+
+def card_article(card):
+    return InlineQueryResultArticle(
+        id=hashlib.md5(f"{card.get('ts')}{card.get('text')}".encode()).hexdigest(),
+        title=f"{card.get('property_type') or 'Карточка'}, {card.get('price') or 'Не указано'}₽",
+        description=" · ".join(str(card[key]) for key in ("address", "district") if card.get(key)),
+        input_message_content=InputTextMessageContent(
+            message_text=card.get("text", ""),
+            link_preview_options=LinkPreviewOptions(is_disabled=True),
+        ),
+    )
+
+@dp.inline_query()
+async def inline_query(query: InlineQuery):
+    # В карточках имена и телефоны собственников — inline-режим только для агентов
+    if query.from_user.id not in envi.agent_ids:
+        await query.answer([], cache_time=60, is_personal=True)
+        return
+
+    text = query.query.strip()
+
+    if AVITO_LISTING_RE.fullmatch(text):
+        # Только кэш и уже идущая загрузка: запросы приходят на каждый набранный символ,
+        # поэтому новую загрузку отсюда не запускаем
+        listing = get_parser().cached_listing(text)
+        if listing is None:
+            listing = await prefetcher.wait(text, INLINE_FETCH_WAIT)
+        if listing is None:
+            if prefetcher.pending(text) is not None:
+                button = InlineQueryResultsButton(text="⏳ Объявление загружается, повторите запрос",
+                                                  start_parameter="loading")
+            else:
+                button = InlineQueryResultsButton(text="⏳ Объявление не загружено — отправьте ссылку боту",
+                                                  start_parameter="avito")
+            await query.answer([], cache_time=1, is_personal=True, button=button)
+            return
+        await query.answer([listing_article(text, listing)], cache_time=300, is_personal=True)
+        return
+
+    offset = int(query.offset) if query.offset.isdigit() else 0
+    try:
+        await get_card_index()
+        positions, next_offset = card_index.search(text, offset, INLINE_PAGE_SIZE)
+        cards = await asyncio.to_thread(card_store.read_at, positions)
+    except Exception:
+        await query.answer([], cache_time=1, is_personal=True)
+        return
+    await query.answer(
+        [card_article(card) for card in cards],
+        cache_time=30,
+        is_personal=True,
+        next_offset=str(next_offset) if next_offset is not None else "",
+    )
+
 @dp.callback_query(F.data == "restart")
 async def restart_form(callback: CallbackQuery, state: FSMContext):
     await new_command(callback.message, state)
@@ -233,6 +480,13 @@ async def get_phone(message: types.Message, state: FSMContext):
               f"😎 {data.get('name', 'Не указано')}\n"
               f"📞 {message.text}")
 
+    # Подсказка, если цена за м² заметно отличается от медианы по району;
+    # пока статистика не загружена, карточка показывается без неё
+    price_stats = loaded_price_stats()
+    if price_stats is not None and (hint := price_stats.price_hint(data.get('price'), data.get('area'),
+                                                                   data.get('district'), data.get('property_type'))):
+        result += f"\n\n⚠️ {hint}"
+
     await delete_previous_messages(state, message.chat.id)
     
     sent_message = await message.answer(result, reply_markup=get_final_keyboard())
@@ -268,9 +522,20 @@ async def send_to_channel(callback: CallbackQuery, state: FSMContext):
             f"<span class='tg-spoiler'>{user_link}</span>")
 
     await bot.send_message(CHANNEL_ID, post, parse_mode="HTML", disable_web_page_preview=True)
+    publish_record({
+        "source": "form",
+        **{key: data.get(key) for key in CARD_FIELDS},
+        "author_id": data.get("user_id"),
+        "author_username": data.get("username"),
+        "text": post,
+    })
     await callback.message.delete()
 
 async def main():
+    # Прогреваем статистику цен и индекс поиска в фоне: импорт NumPy и чтение истории не задерживают старт
+    get_price_stats()
+    get_card_index()
+    print(f"Бот готов к приёму обновлений через {time.perf_counter() - STARTED_AT:.3f} с после старта")
     await dp.start_polling(bot)
 
 if __name__ == "__main__":
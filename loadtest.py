@@ -0,0 +1,282 @@
+""" Нагрузочный прогон бота: тысячи синтетических пользователей проходят
+сценарии /new и /avito через dp.feed_update.
+
+Сеть не используется: сессия бота подменяется заглушкой, которая имитирует
+задержку Telegram API и ошибки flood control, а Avito отвечает локальный
+HTTP-сервер (он же подставлен парсеру как прокси).
+
+Запуск: python loadtest.py --users 2000 --concurrency 200
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import resource
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import get_origin
+
+# Фиктивные настройки до импорта bot: токен должен быть валидным по формату
+os.environ.setdefault("TOKEN", "123456789:AAFakeTokenForLoadTestingOnly0000000")
+os.environ.setdefault("CHANNEL_ID", "-1001234567890")
+
+from aiogram.client.session.base import BaseSession
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import Message, Update
+
+import bot as bot_module
+from bot import bot, districts, dp, property_types
+
+LISTING_HTML = """<html><head><title>{rooms}-к. квартира, {area} м², {floor}/9 эт. на продажу | Авито</title></head>
+<body>
+<span itemprop="price" content="{price}"></span>
+<div data-marker="item-view/item-params"><ul>
+<li class="params-paramsList__item-_2Y2O"><span class="styles-module-noAccent-l9CMS">Количество комнат: </span>{rooms}</li>
+<li class="params-paramsList__item-_2Y2O"><span class="styles-module-noAccent-l9CMS">Общая площадь: </span>{area} м²</li>
+<li class="params-paramsList__item-_2Y2O"><span class="styles-module-noAccent-l9CMS">Этаж: </span>{floor} из 9</li>
+</ul></div>
+<span class="style-item-address__string-wt61A">Свердловская область, Екатеринбург, ул. Ленина, {floor}</span>
+</body></html>"""
+
+
+class MockSession(BaseSession):
+    """Сессия-заглушка: отвечает на методы Bot API без сети с заданной задержкой
+    и с вероятностью flood_rate выбрасывает TelegramRetryAfter."""
+
+    def __init__(self, latency=0.03, flood_rate=0.0, rnd=None):
+        super().__init__()
+        self.latency = latency
+        self.flood_rate = flood_rate
+        self._rnd = rnd or random.Random()
+        self._message_ids = itertools.count(1_000_000)
+        self.calls = Counter()
+
+    async def close(self):
+        pass
+
+    async def make_request(self, bot, method, timeout=None):
+        name = type(method).__name__
+        self.calls[name] += 1
+        # Экспоненциальное распределение задержки с заданным средним
+        await asyncio.sleep(self._rnd.expovariate(1 / self.latency) if self.latency else 0)
+        if self._rnd.random() < self.flood_rate:
+            self.calls["RetryAfter"] += 1
+            raise TelegramRetryAfter(method=method, message="Too Many Requests", retry_after=1)
+
+        # Ответы пользователю с ❌ — видимые ошибки сценария (например, сбой парсинга)
+        if str(getattr(method, "text", "")).startswith("❌"):
+            self.calls["ErrorReply"] += 1
+
+        returning = method.__returning__
+        if returning is Message:
+            return self._message(bot, method)
+        if get_origin(returning) is list:
+            return [self._message(bot, method)]
+        return True
+
+    def _message(self, bot, method):
+        chat_id = getattr(method, "chat_id", 0)
+        return Message.model_validate(
+            {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": int(chat_id), "type": "private"},
+                "text": getattr(method, "text", None),
+            },
+            context={"bot": bot},
+        )
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+
+class AvitoStubHandler(BaseHTTPRequestHandler):
+    delay = 0.0
+
+    def do_GET(self):
+        if self.delay:
+            time.sleep(self.delay)
+        # Объявления детерминированы по URL, чтобы повторы попадали в кэш с тем же содержимым
+        rnd = random.Random(self.path)
+        body = LISTING_HTML.format(
+            rooms=rnd.randint(1, 4),
+            area=rnd.randint(20, 120),
+            floor=rnd.randint(1, 9),
+            price=rnd.randint(2, 15) * 500_000,
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_avito_stub(delay):
+    AvitoStubHandler.delay = delay
+    server = ThreadingHTTPServer(("127.0.0.1", 0), AvitoStubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class SyntheticUser:
+    _update_ids = itertools.count(1)
+
+    def __init__(self, user_id, rnd):
+        self.user_id = user_id
+        self.rnd = rnd
+        self._message_ids = itertools.count(1)
+        self.user = {"id": user_id, "is_bot": False, "first_name": "Агент", "username": f"agent{user_id}"}
+        self.chat = {"id": user_id, "type": "private"}
+
+    def _update(self, **payload):
+        return Update.model_validate({"update_id": next(self._update_ids), **payload}, context={"bot": bot})
+
+    def message(self, text):
+        return self._update(message={
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": self.chat,
+            "from": self.user,
+            "text": text,
+        })
+
+    def callback(self, data):
+        bot_message = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": self.chat,
+            "from": {"id": bot.id, "is_bot": True, "first_name": "Бот"},
+            "text": "…",
+        }
+        return self._update(callback_query={
+            "id": f"{self.user_id}-{next(self._message_ids)}",
+            "from": self.user,
+            "chat_instance": str(self.user_id),
+            "data": data,
+            "message": bot_message,
+        })
+
+    def new_card_flow(self):
+        rnd = self.rnd
+        yield self.message("/new")
+        yield self.message(f"ул. Ленина, {rnd.randint(1, 200)}")
+        yield self.callback(f"district:{rnd.choice(districts)}")
+        yield self.callback(f"property_type:{rnd.choice(property_types)}")
+        yield self.message(str(rnd.randint(2, 15) * 500_000))
+        yield self.message(f"{rnd.randint(1, 9)}/9")
+        yield self.message(str(rnd.randint(20, 120)))
+        yield self.message(str(rnd.randint(1, 4)))
+        yield self.message("Иван")
+        yield self.message("+79000000000")
+        yield self.callback("send_to_channel")
+
+    def avito_flow(self, listings):
+        yield self.message("/avito")
+        yield self.message(f"http://www.avito.ru/ekaterinburg/kvartiry/1-k._kvartira_{4574477371 + self.rnd.randrange(listings)}")
+        yield self.message("Иван")
+        yield self.message("+79000000000")
+
+
+async def run_user(user, flow, latencies, errors):
+    for update in flow:
+        start = time.perf_counter()
+        try:
+            await dp.feed_update(bot, update)
+        except Exception as e:
+            errors[type(e).__name__] += 1
+        latencies.append(time.perf_counter() - start)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def rss_kb():
+    # На Linux ru_maxrss — пиковый RSS процесса в килобайтах
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+async def run(args):
+    rnd = random.Random(args.seed)
+    session = MockSession(latency=args.latency, flood_rate=args.flood_rate, rnd=rnd)
+    bot.session = session
+
+    server = start_avito_stub(args.avito_delay)
+    from app.avito_parser import parser
+    from app.cards import card_store
+    from app.fetcher import Fetcher
+    # Кэш и хранилище карточек — во временном каталоге, чтобы не засорять рабочий cache/
+    parser.cache_dir = tempfile.mkdtemp(prefix="loadtest-cache-")
+    card_store.path = os.path.join(parser.cache_dir, "cards.jsonl")
+    # Локальная заглушка выступает HTTP-прокси: парсер ходит на http://www.avito.ru/…, ответ приходит от неё
+    parser.fetcher = Fetcher(proxies=[f"http://127.0.0.1:{server.server_port}"], retries=1, backoff=0.01)
+
+    users = [SyntheticUser(10_000 + i, random.Random(rnd.random())) for i in range(args.users)]
+    flows = [
+        user.avito_flow(args.listings) if user.rnd.random() < args.avito_share else user.new_card_flow()
+        for user in users
+    ]
+
+    latencies = []
+    errors = Counter()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def limited(user, flow):
+        async with semaphore:
+            await run_user(user, flow, latencies, errors)
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    rss_before = rss_kb()
+    start = time.perf_counter()
+    await asyncio.gather(*(limited(user, flow) for user, flow in zip(users, flows)))
+    elapsed = time.perf_counter() - start
+    rss_after = rss_kb()
+
+    print(f"Пользователей: {args.users}, параллельно: {args.concurrency}")
+    print(f"Обновлений: {len(latencies)} за {elapsed:.2f} с — {len(latencies) / elapsed:,.0f} обновлений/с")
+    print(f"Задержка обработчика: p50 {percentile(latencies, 0.5) * 1000:.1f} мс, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.1f} мс")
+    print(f"Пиковый RSS: {rss_before / 1024:.1f} → {rss_after / 1024:.1f} МБ (+{(rss_after - rss_before) / 1024:.1f} МБ)")
+    if args.tracemalloc:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"tracemalloc: сейчас {current / 2**20:.1f} МБ, пик {peak / 2**20:.1f} МБ")
+    print(f"Вызовы Bot API: {dict(session.calls)}")
+    print(bot_module.prefetcher.render_stats())
+    if errors:
+        print(f"Ошибки обработчиков: {dict(errors)}")
+
+    server.shutdown()
+    await dp.storage.close()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--users", type=int, default=2000)
+    arg_parser.add_argument("--concurrency", type=int, default=200)
+    arg_parser.add_argument("--avito-share", type=float, default=0.5, help="доля пользователей в сценарии /avito")
+    arg_parser.add_argument("--listings", type=int, default=500, help="число различных объявлений Avito")
+    arg_parser.add_argument("--latency", type=float, default=0.03, help="средняя задержка Telegram API, с")
+    arg_parser.add_argument("--flood-rate", type=float, default=0.001, help="доля ответов flood control")
+    arg_parser.add_argument("--avito-delay", type=float, default=0.05, help="задержка ответа Avito, с")
+    arg_parser.add_argument("--seed", type=int, default=51)
+    arg_parser.add_argument("--tracemalloc", action="store_true", help="считать память через tracemalloc (медленно)")
+    args = arg_parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
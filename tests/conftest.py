@@ -0,0 +1,72 @@
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class StubServer:
+    """Локальный HTTP-сервер с заготовленными ответами (статус, заголовки, тело):
+    постоянными по пути или из общей очереди."""
+
+    def __init__(self):
+        self.routes = {}
+        self.responses = deque()
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests.append(self.path)
+                if self.path in stub.routes:
+                    status, headers, body = stub.routes[self.path]
+                else:
+                    status, headers, body = stub.responses.popleft() if stub.responses else (200, {}, b"ok")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                if "Transfer-Encoding" not in headers:
+                    self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if headers.get("Transfer-Encoding") == "chunked":
+                    # Тело частями без Content-Length: размер заранее неизвестен
+                    for start in range(0, len(body), 65536):
+                        chunk = body[start:start + 65536]
+                        self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                    self.wfile.write(b"0\r\n\r\n")
+                else:
+                    self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        Handler.protocol_version = "HTTP/1.1"
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+
+    def reply(self, status=200, body=b"ok", **headers):
+        self.responses.append((status, _headers(headers), body))
+
+    def route(self, path, status=200, body=b"ok", **headers):
+        self.routes[path] = (status, _headers(headers), body)
+        return self.url + path
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _headers(headers):
+    return {name.replace("_", "-"): value for name, value in headers.items()}
+
+
+@pytest.fixture
+def stub_server():
+    server = StubServer()
+    server.start()
+    yield server
+    server.stop()
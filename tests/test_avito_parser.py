@@ -0,0 +1,38 @@
+import pytest
+
+from app.avito_parser import classify_estate_type, normalize_address
+
+
+@pytest.mark.parametrize("address, expected", [
+    # Без запятых — адрес как есть
+    ("Екатеринбург", "Екатеринбург"),
+    # Одна запятая: улица и дом остаются на одной строке
+    ("ул. Ленина, 5", "ул. Ленина, 5"),
+    ("Свердловская область, Екатеринбург", "Свердловская область\n 📍 Екатеринбург"),
+    # Две и больше запятых
+    ("Екатеринбург, ул. Ленина, 5", "Екатеринбург\n 📍 ул. Ленина, 5"),
+    ("Свердловская область, Екатеринбург, ул. Ленина, 5",
+     "Свердловская область\n 📍 Екатеринбург\n 📍 ул. Ленина, 5"),
+    # Последняя часть без улицы и номера дома — переносится отдельной строкой
+    ("Свердловская область, Екатеринбург, Верх-Исетский район",
+     "Свердловская область\n 📍 Екатеринбург\n 📍 Верх-Исетский район"),
+    # Номер дома в последней части держит при себе улицу без сокращения «ул.»
+    ("Екатеринбург, Вильгельма де Геннина, 31", "Екатеринбург\n 📍 Вильгельма де Геннина, 31"),
+    ("Екатеринбург, Малышева, 51к2", "Екатеринбург\n 📍 Малышева, 51к2"),
+])
+def test_normalize_address(address, expected):
+    assert normalize_address(address) == expected
+
+
+@pytest.mark.parametrize("title, expected", [
+    ("2-к. квартира, 45 м², 3/9 эт.", "Квартира"),
+    # Ключ «квартира» — в нижнем регистре, поэтому заголовок студии с ним не совпадает
+    ("Квартира-студия, 25 м², 5/16 эт.", "Студия"),
+    ("Комната 18 м² в 3-к., 2/5 эт.", "Комната"),
+    ("Дом 120 м² на участке 6 сот.", "Дом"),
+    ("Гараж, 18 м²", "Гараж"),
+    ("Участок 10 сот. (ИЖС)", "ИЖС"),
+    ("Офис, 50 м²", "Не указано"),
+])
+def test_classify_estate_type(title, expected):
+    assert classify_estate_type(title) == expected
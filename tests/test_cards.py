@@ -0,0 +1,74 @@
+import json
+
+from app.cards import CardIndex, CardStore
+
+
+def test_append_and_iterate(tmp_path):
+    store = CardStore(str(tmp_path / "cache" / "cards.jsonl"))
+    assert list(store) == []
+
+    first, record = store.append({"address": "ул. Ленина, 5", "price": "5 000 000"})
+    second, _ = store.append({"address": "ул. Мира, 1"})
+
+    assert record["ts"]
+    assert [card["address"] for card in store] == ["ул. Ленина, 5", "ул. Мира, 1"]
+    assert [card["address"] for card in store.read_at([second, first])] == ["ул. Мира, 1", "ул. Ленина, 5"]
+
+
+def test_torn_line_is_skipped(tmp_path):
+    path = tmp_path / "cards.jsonl"
+    good = json.dumps({"address": "ул. Ленина, 5"}, ensure_ascii=False)
+    # Сбой посреди дозаписи: последняя строка оборвана и без перевода строки
+    path.write_text(f"{good}\n{{\"address\": \"ул. Ми", encoding="utf-8")
+    store = CardStore(str(path))
+
+    assert [card["address"] for card in store] == ["ул. Ленина, 5"]
+
+    # Следующая запись начинается с новой строки и не склеивается с оборванной
+    store.append({"address": "ул. Мира, 1"})
+    assert [card["address"] for card in store] == ["ул. Ленина, 5", "ул. Мира, 1"]
+
+
+def test_read_stops_at_offset(tmp_path):
+    store = CardStore(str(tmp_path / "cards.jsonl"))
+    store.append({"address": "первая"})
+    end = store.size()
+    store.append({"address": "вторая"})
+
+    assert [card["address"] for _, card in store.read(end)] == ["первая"]
+    offsets = [offset for offset, _ in store.read()]
+    assert offsets == [0, end]
+
+
+def test_index_search_pages_newest_first(tmp_path):
+    store = CardStore(str(tmp_path / "cards.jsonl"))
+    for n in range(5):
+        store.append({"address": f"ул. Ленина, {n}", "district": "ВИЗ" if n % 2 else "Центр"})
+    index = CardIndex(store)
+    index.begin_load()
+    index.finish_load(index.read_entries())
+
+    positions, next_offset = index.search("виз", limit=1)
+    assert [card["address"] for card in store.read_at(positions)] == ["ул. Ленина, 3"]
+    assert next_offset == 1
+    positions, next_offset = index.search("виз", next_offset, limit=1)
+    assert [card["address"] for card in store.read_at(positions)] == ["ул. Ленина, 1"]
+    assert next_offset is None
+
+
+def test_index_keeps_cards_added_during_load(tmp_path):
+    store = CardStore(str(tmp_path / "cards.jsonl"))
+    store.append({"address": "ул. Ленина, 5"})
+    index = CardIndex(store)
+    # До начала загрузки добавления не нужны — их прочтёт сама загрузка
+    index.add(*store.append({"address": "ул. Мира, 1"}))
+
+    index.begin_load()
+    end = store.size()
+    index.add(*store.append({"address": "ул. Луначарского, 7"}))
+    index.finish_load(index.read_entries(end))
+
+    positions, _ = index.search("")
+    assert [card["address"] for card in store.read_at(positions)] == [
+        "ул. Луначарского, 7", "ул. Мира, 1", "ул. Ленина, 5",
+    ]
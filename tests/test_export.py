@@ -0,0 +1,72 @@
+import csv
+
+import pytest
+
+from app import export
+from app.cards import CardStore
+from app.export import chunked, export_cards, filter_cards
+
+CARDS = [
+    {"ts": "2025-01-31T23:59:59+00:00", "district": "ВИЗ", "author_id": 1, "author_username": "Ivan", "price": "1"},
+    {"ts": "2025-02-01T00:00:00+00:00", "district": "Центр", "author_id": 2, "author_username": None, "price": "2"},
+    {"ts": "2025-02-28T12:00:00+00:00", "district": "ВИЗ", "author_id": 2, "author_username": None, "price": "3"},
+    {"ts": "2025-03-01T00:00:00+00:00", "district": "ВИЗ", "author_id": 3, "author_username": "petr", "price": "4"},
+]
+
+
+def prices(cards):
+    return [card["price"] for card in cards]
+
+
+def test_filter_dates_are_inclusive():
+    assert prices(filter_cards(CARDS, since="2025-02-01", until="2025-02-28")) == ["2", "3"]
+    assert prices(filter_cards(CARDS, since="2025-01-31", until="2025-01-31")) == ["1"]
+    assert prices(filter_cards(CARDS, since="2025-03-01")) == ["4"]
+
+
+def test_filter_by_author_and_district():
+    assert prices(filter_cards(CARDS, author="@ivan")) == ["1"]
+    assert prices(filter_cards(CARDS, author="petr")) == ["4"]
+    assert prices(filter_cards(CARDS, author="2")) == ["2", "3"]
+    assert prices(filter_cards(CARDS, district="ВИЗ", author="2")) == ["3"]
+
+
+def test_chunked():
+    assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(chunked([], 2)) == []
+
+
+def test_csv_round_trip(tmp_path):
+    store = CardStore(str(tmp_path / "cards.jsonl"))
+    store.append({"source": "form", "address": "ул. Ленина, 5", "district": "Широкая речка",
+                  "price": "5 500 000", "author_id": 7, "text": "не выгружается"})
+    store.append({"source": "avito", "address": "ул. Мира, «1»", "district": "ВИЗ", "url": "https://www.avito.ru/x_1234567"})
+    path = tmp_path / "cards.csv"
+
+    assert export_cards(str(path), "csv", store=store, chunk_size=1, district="Широкая речка") == 1
+    assert export_cards(str(path), "csv", store=store, chunk_size=1) == 2
+
+    with open(path, encoding="utf-8-sig", newline="") as file:
+        rows = list(csv.DictReader(file))
+    assert list(rows[0]) == list(export.EXPORT_FIELDS)
+    assert rows[0]["address"] == "ул. Ленина, 5" and rows[0]["price"] == "5 500 000" and rows[0]["author_id"] == "7"
+    assert rows[1]["address"] == "ул. Мира, «1»" and rows[1]["url"] == "https://www.avito.ru/x_1234567"
+    assert rows[1]["price"] == ""
+
+
+def test_parquet_requires_pyarrow(tmp_path, monkeypatch):
+    monkeypatch.setattr(export.importlib.util, "find_spec", lambda name: None)
+    assert export.available_formats() == ("csv",)
+    with pytest.raises(ValueError, match="pyarrow"):
+        export_cards(str(tmp_path / "cards.parquet"), "parquet", store=CardStore(str(tmp_path / "cards.jsonl")))
+
+
+def test_parquet_round_trip(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    store = CardStore(str(tmp_path / "cards.jsonl"))
+    store.append({"address": "ул. Ленина, 5", "price": 5500000, "author_id": 7})
+    path = tmp_path / "cards.parquet"
+
+    assert export_cards(str(path), "parquet", store=store) == 1
+    [row] = pq.read_table(path).to_pylist()
+    assert row["address"] == "ул. Ленина, 5" and row["price"] == "5500000" and row["author_id"] == 7
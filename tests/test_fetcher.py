@@ -0,0 +1,140 @@
+import pytest
+
+from app.fetcher import CircuitOpenError, Fetcher, FetchError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def sleeps():
+    return []
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def make_fetcher(sleeps, clock, **kwargs):
+    return Fetcher(sleep=sleeps.append, clock=clock, timeout=2, **kwargs)
+
+
+def test_retries_until_success(stub_server, sleeps, clock):
+    stub_server.reply(503)
+    stub_server.reply(502)
+    stub_server.reply(200, "<html>объявление</html>".encode())
+
+    fetcher = make_fetcher(sleeps, clock, retries=3, backoff=0.5)
+    assert fetcher.get(stub_server.url + "/item_1234567") == "<html>объявление</html>"
+    assert len(stub_server.requests) == 3
+    # Задержка с полным джиттером: не больше backoff * 2 ** attempt
+    assert len(sleeps) == 2
+    assert 0 <= sleeps[0] <= 0.5 and 0 <= sleeps[1] <= 1.0
+    assert not fetcher.breaker(stub_server.url).is_open
+
+
+def test_gives_up_after_retries(stub_server, sleeps, clock):
+    for _ in range(3):
+        stub_server.reply(500)
+
+    fetcher = make_fetcher(sleeps, clock, retries=2)
+    with pytest.raises(FetchError) as error:
+        fetcher.get(stub_server.url + "/item_1234567")
+    assert error.value.status == 500
+    assert len(stub_server.requests) == 3
+
+
+def test_client_error_is_not_retried(stub_server, sleeps, clock):
+    stub_server.reply(404)
+
+    fetcher = make_fetcher(sleeps, clock, retries=3)
+    with pytest.raises(FetchError) as error:
+        fetcher.get(stub_server.url + "/item_1234567")
+    assert error.value.status == 404
+    assert len(stub_server.requests) == 1
+    assert sleeps == []
+
+
+def test_honours_retry_after(stub_server, sleeps, clock):
+    stub_server.reply(429, Retry_After="3")
+    stub_server.reply(503, Retry_After="8")
+    stub_server.reply(200)
+
+    fetcher = make_fetcher(sleeps, clock, retries=2, max_backoff=8.0)
+    assert fetcher.get(stub_server.url + "/item_1234567") == "ok"
+    # Retry-After в пределах max_backoff заменяет джиттер
+    assert sleeps == [3.0, 8.0]
+
+
+def test_long_retry_after_stops_retries(stub_server, sleeps, clock):
+    stub_server.reply(429, Retry_After="120")
+
+    fetcher = make_fetcher(sleeps, clock, retries=3, max_backoff=8.0)
+    url = stub_server.url + "/item_1234567"
+    with pytest.raises(FetchError) as error:
+        fetcher.get(url)
+    assert error.value.status == 429
+    assert sleeps == []
+    assert len(stub_server.requests) == 1
+
+    # До истечения Retry-After хост не запрашивается
+    clock.now = 119.0
+    with pytest.raises(CircuitOpenError):
+        fetcher.get(url)
+    assert len(stub_server.requests) == 1
+
+    clock.now = 120.0
+    assert fetcher.get(url) == "ok"
+    assert len(stub_server.requests) == 2
+
+
+def test_breaker_opens_and_probes(stub_server, sleeps, clock):
+    fetcher = make_fetcher(sleeps, clock, retries=0, breaker_threshold=2, breaker_reset=60.0)
+    url = stub_server.url + "/item_1234567"
+
+    for _ in range(2):
+        stub_server.reply(503)
+        with pytest.raises(FetchError):
+            fetcher.get(url)
+    assert fetcher.breaker(url).is_open
+
+    # Разомкнутый предохранитель отклоняет запрос, не обращаясь к серверу
+    with pytest.raises(CircuitOpenError):
+        fetcher.get(url)
+    assert len(stub_server.requests) == 2
+
+    # После reset_timeout пропускается одна пробная попытка; её неудача снова размыкает цепь
+    clock.now = 61.0
+    stub_server.reply(503)
+    with pytest.raises(FetchError) as error:
+        fetcher.get(url)
+    assert not isinstance(error.value, CircuitOpenError)
+    assert len(stub_server.requests) == 3
+    with pytest.raises(CircuitOpenError):
+        fetcher.get(url)
+
+    # Удачная проба замыкает цепь
+    clock.now = 122.0
+    stub_server.reply(200)
+    assert fetcher.get(url) == "ok"
+    assert not fetcher.breaker(url).is_open
+    assert fetcher.get(url) == "ok"
+    assert len(stub_server.requests) == 5
+
+
+def test_breaker_allows_single_probe(clock):
+    fetcher = make_fetcher([], clock, breaker_threshold=1, breaker_reset=10.0)
+    breaker = fetcher.breaker("http://www.avito.ru/item_1234567")
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    clock.now = 10.0
+    assert breaker.allow()
+    # Пока проба не завершилась, остальные запросы отклоняются
+    assert not breaker.allow()
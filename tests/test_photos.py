@@ -0,0 +1,184 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from app import photos
+
+MAX_BYTES = 100_000
+
+
+class FakeBotAPI:
+    """Минимальный Bot API: принимает sendMessage/sendPhoto/sendMediaGroup,
+    запоминает метод и тело запроса и отклоняет «устаревшие» file_id из stale."""
+
+    def __init__(self):
+        self.calls = []
+        self.bodies = []
+        self.stale = set()
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self._body()
+                method = self.path.rsplit("/", 1)[1]
+                api.calls.append((method, len(body)))
+                api.bodies.append(body)
+                # file_id уникален для каждого запроса, чтобы отличать повторные загрузки
+                generation = len(api.calls)
+                if any(file_id.encode() in body for file_id in api.stale):
+                    status, payload = 400, {"ok": False, "error_code": 400,
+                                            "description": "Bad Request: wrong file identifier/HTTP URL specified"}
+                elif method == "sendMediaGroup":
+                    status, payload = 200, {"ok": True, "result": [
+                        _photo_message(generation, i) for i in range(len(_media(body)))]}
+                elif method == "sendPhoto":
+                    status, payload = 200, {"ok": True, "result": _photo_message(generation, 0)}
+                else:
+                    status, payload = 200, {"ok": True, "result": {
+                        "message_id": 100, "date": 0, "chat": {"id": -100, "type": "channel"}, "text": "…"}}
+                payload = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _body(self):
+                if self.headers.get("Content-Length"):
+                    return self.rfile.read(int(self.headers["Content-Length"]))
+                # Загрузка файлов приходит частями (chunked)
+                body = b""
+                while size := int(self.rfile.readline().strip(), 16):
+                    body += self.rfile.read(size)
+                    self.rfile.readline()
+                self.rfile.readline()
+                return body
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def methods(self):
+        return [method for method, _ in self.calls]
+
+
+def _photo_message(generation, message_id):
+    file_id = f"file-{generation}-{message_id}"
+    return {
+        "message_id": message_id, "date": 0, "chat": {"id": -100, "type": "channel"},
+        "photo": [{"file_id": file_id, "file_unique_id": file_id, "width": 1, "height": 1}],
+    }
+
+
+def _media(body):
+    if b'name="media"' in body:
+        return json.loads(body.split(b'name="media"')[1].split(b"\r\n\r\n", 1)[1].split(b"\r\n--")[0])
+    return json.loads(parse_qs(body.decode())["media"][0])
+
+
+@pytest.fixture
+def bot_api():
+    api = FakeBotAPI()
+    yield api
+    api._server.shutdown()
+    api._server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def file_ids(tmp_path, monkeypatch):
+    cache = photos.FileIdCache(str(tmp_path / "file_ids.json"))
+    monkeypatch.setattr(photos, "file_id_cache", cache)
+    return cache
+
+
+def send(bot_api, urls, text="🏠 карточка"):
+    async def run():
+        bot = Bot("123456:ABCdefGhIJKlmnoPQRstuVWXyz", session=AiohttpSession(api=TelegramAPIServer.from_base(bot_api.url)))
+        try:
+            return await photos.send_card(bot, -100, text, urls, max_bytes=MAX_BYTES)
+        finally:
+            await bot.session.close()
+            await photos._session().close()
+
+    return asyncio.run(run())
+
+
+def test_oversized_chunked_photo_is_skipped(stub_server, bot_api, file_ids):
+    small = stub_server.route("/small.jpg", body=b"x" * 5_000)
+    huge = stub_server.route("/huge.jpg", body=b"x" * (MAX_BYTES * 3), Transfer_Encoding="chunked")
+
+    messages = send(bot_api, [huge, small])
+
+    assert len(messages) == 1
+    assert bot_api.methods() == ["sendPhoto"]
+    assert file_ids.get(small) == "file-1-0"
+    assert file_ids.get(huge) is None
+
+
+def test_only_oversized_photos_fall_back_to_text(stub_server, bot_api):
+    huge = stub_server.route("/huge.jpg", body=b"x" * (MAX_BYTES + 1), Transfer_Encoding="chunked")
+    declared = stub_server.route("/declared.jpg", body=b"x" * (MAX_BYTES + 1))
+
+    messages = send(bot_api, [huge, declared])
+
+    assert len(messages) == 1
+    assert bot_api.methods() == ["sendMessage"]
+
+
+def test_chunked_photo_within_limit_is_uploaded(stub_server, bot_api, file_ids):
+    first = stub_server.route("/1.jpg", body=b"a" * MAX_BYTES, Transfer_Encoding="chunked")
+    second = stub_server.route("/2.jpg", body=b"b" * 20_000)
+
+    messages = send(bot_api, [first, second])
+
+    assert len(messages) == 2
+    [(method, size)] = bot_api.calls
+    assert method == "sendMediaGroup"
+    # Прочитанное наперёд тело загружено целиком
+    assert size > MAX_BYTES + 20_000
+    assert file_ids.get(first) == "file-1-0" and file_ids.get(second) == "file-1-1"
+
+
+def test_repost_uses_cached_file_ids(stub_server, bot_api, file_ids):
+    urls = [stub_server.route(f"/{n}.jpg", body=b"x" * 5_000) for n in range(3)]
+
+    send(bot_api, urls)
+    assert len(stub_server.requests) == 3
+    cached = [file_ids.get(url) for url in urls]
+    assert cached == ["file-1-0", "file-1-1", "file-1-2"]
+
+    messages = send(bot_api, urls)
+
+    assert len(messages) == 3
+    # Повторная публикация не скачивает и не загружает фото заново — только file_id
+    assert len(stub_server.requests) == 3
+    assert bot_api.methods() == ["sendMediaGroup", "sendMediaGroup"]
+    assert [item["media"] for item in _media(bot_api.bodies[-1])] == cached
+    assert bot_api.calls[-1][1] < 5_000
+
+
+def test_stale_file_ids_are_uploaded_again(stub_server, bot_api, file_ids):
+    urls = [stub_server.route(f"/{n}.jpg", body=b"x" * 5_000) for n in range(2)]
+    send(bot_api, urls)
+    bot_api.stale.update(file_ids.get(url) for url in urls)
+
+    messages = send(bot_api, urls)
+
+    assert len(messages) == 2
+    # Отклонённые file_id забыты, фото скачаны и загружены снова, кэш обновлён
+    assert bot_api.methods() == ["sendMediaGroup"] * 3
+    assert len(stub_server.requests) == 4
+    assert [file_ids.get(url) for url in urls] == ["file-3-0", "file-3-1"]
@@ -0,0 +1,41 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Импорт bot не должен тянуть парсер и тяжёлые зависимости — они грузятся при первом использовании
+HEAVY_MODULES = ("bs4", "requests", "numpy", "app.avito_parser")
+# С запасом: один aiogram импортируется около 2–3 секунд на медленной машине
+IMPORT_BUDGET = 10.0
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import bot
+print(json.dumps({"seconds": time.perf_counter() - start, "modules": sorted(sys.modules)}))
+"""
+
+
+def test_bot_import_is_lazy_and_fast(tmp_path):
+    env = {
+        **os.environ,
+        "TOKEN": "123456789:AAFakeTokenForStartupTestOnly000000",
+        "CHANNEL_ID": "-1001234567890",
+        "PYTHONPATH": ROOT,
+    }
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=tmp_path, env=env,
+        capture_output=True, text=True, timeout=60,
+    )
+    wall = time.perf_counter() - start
+    assert result.returncode == 0, result.stderr
+
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    loaded = [name for name in HEAVY_MODULES if name in report["modules"]]
+    assert loaded == []
+    assert report["seconds"] < IMPORT_BUDGET
+    assert wall < IMPORT_BUDGET * 1.5